@@ -2,12 +2,17 @@ import requests
 import urllib3
 import pandas as pd
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from app.config.settings import get_settings
 
 # Deshabilitar advertencias SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Consulta de equipos en bloques paralelos
+CRM_CHUNK_SIZE = 200
+CRM_MAX_WORKERS = 4
+
 
 class CRMService:
     """Servicio para interactuar con el CRM API"""
@@ -114,23 +119,58 @@ class CRMService:
             print(f"Excepción consultando CRM: {e}")
             return None
     
-    def get_equipos_dataframe(self, seriales: List[str]) -> Optional[pd.DataFrame]:
+    def get_equipos_dataframe(self, seriales: List[str],
+                              chunk_size: int = CRM_CHUNK_SIZE) -> Optional[pd.DataFrame]:
         """
         Obtiene información de equipos como DataFrame
         
+        Si hay más de `chunk_size` seriales, se consultan en bloques en paralelo
+        para solapar la latencia de las peticiones al CRM
+        
         Args:
             seriales: Lista de números de serie
+            chunk_size: Máximo de seriales por petición
         
         Returns:
             DataFrame con información o None si hay error
         """
-        response_data = self.get_equipos_info(seriales)
+        # Convertir a lista Python si es numpy array
+        if hasattr(seriales, 'tolist'):
+            seriales_list = seriales.tolist()
+        else:
+            seriales_list = list(seriales)
+        
+        if chunk_size >= len(seriales_list):
+            response_data = self.get_equipos_info(seriales_list)
+            
+            if response_data and 'data' in response_data:
+                df = pd.DataFrame(response_data['data'])
+                return df
+            
+            return None
+        
+        # Renovar token antes de lanzar los hilos para no pedirlo en paralelo
+        if not self.ensure_valid_token():
+            return None
+        
+        chunks = [
+            seriales_list[i:i + chunk_size]
+            for i in range(0, len(seriales_list), chunk_size)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=CRM_MAX_WORKERS) as executor:
+            responses = list(executor.map(self.get_equipos_info, chunks))
+        
+        valid_responses = [r for r in responses if r and 'data' in r]
+        
+        if not valid_responses:
+            return None
         
-        if response_data and 'data' in response_data:
-            df = pd.DataFrame(response_data['data'])
-            return df
+        if len(valid_responses) < len(chunks):
+            print(f"Advertencia CRM: {len(chunks) - len(valid_responses)} de {len(chunks)} bloques fallaron")
         
-        return None
+        equipos = [equipo for r in valid_responses for equipo in r['data']]
+        return pd.DataFrame(equipos)
     
     def get_maintenance_metadata(self, df_mttos: pd.DataFrame) -> tuple:
         """
@@ -1,11 +1,30 @@
 import requests
 import logging
-from typing import List, Dict, Optional, Tuple, Set
+import json
+from typing import List, Dict, Optional, Tuple, Set, Iterator
 from datetime import datetime
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Máximo de registros por petición de inserción en batch
+BATCH_INSERT_SIZE = 1000
+
+# Registros por página al iterar mantenimientos
+STREAM_PAGE_SIZE = 1000
+
+# Columnas consumidas por los llamadores de get_mantenimientos_by_seriales
+# (metadatos de mantenimiento, historial y verificación de duplicados)
+MANTENIMIENTOS_COLUMNS = (
+    'serial',
+    'datetime_maintenance_end',
+    'customer_name',
+    'device_brand',
+    'device_model',
+    'report_id',
+    'maintenance_remarks'
+)
+
 
 class MantenimientosAPIClient:
     """Cliente para consumir el API REST de Mantenimientos en GCP - OPTIMIZADO"""
@@ -26,6 +45,9 @@ class MantenimientosAPIClient:
             "Accept-Profile": "monitoreo_equipos",
             "Content-Profile": "monitoreo_equipos"
         }
+        
+        # Sesión persistente: reutiliza la conexión TCP/TLS entre peticiones
+        self.session = requests.Session()
     
     def _make_request(self, method: str, endpoint: str, headers: Dict = None, **kwargs) -> Optional[Dict]:
         """
@@ -48,7 +70,7 @@ class MantenimientosAPIClient:
         
         try:
             logger.debug(f"Realizando {method} a {url}")
-            response = requests.request(method, url, **kwargs, timeout=30)
+            response = self.session.request(method, url, **kwargs, timeout=30)
             response.raise_for_status()
             
             # PostgREST puede retornar 201 sin body en algunos casos
@@ -70,47 +92,89 @@ class MantenimientosAPIClient:
             logger.error(f"Error inesperado: {str(e)}")
             return None
     
-    def get_mantenimientos_by_seriales(self, seriales: List[str]) -> List[Dict]:
+    def iter_mantenimientos_by_seriales(self, seriales: List[str],
+                                        limit: Optional[int] = None,
+                                        page_size: int = STREAM_PAGE_SIZE) -> Iterator[Dict]:
         """
-        Obtiene mantenimientos filtrados por seriales
+        Itera mantenimientos filtrados por seriales, página por página
+        
+        Sólo se proyectan las columnas de MANTENIMIENTOS_COLUMNS y el orden
+        (serial, fecha de fin descendente) se resuelve en la base de datos,
+        apoyado en el índice idx_mant_serial_end. Cada página se pide al
+        consumirse la anterior, así la memoria queda acotada a `page_size`
+        registros.
         
         Args:
             seriales: Lista de números de serie
+            limit: Número máximo de registros (opcional)
+            page_size: Registros por petición
         
-        Returns:
-            Lista de mantenimientos
+        Yields:
+            Mantenimientos, más recientes primero por serial
+        
+        Raises:
+            ConnectionError: Si alguna página no pudo obtenerse
         """
         if not seriales:
-            logger.warning("Lista de seriales vacía")
-            return []
+            return
+        
+        # El API espera un query parameter con los seriales
+        # Formato: ?serial=in.(SERIAL1,SERIAL2,SERIAL3)
+        seriales_str = ','.join(seriales)
+        params = {
+            'serial': f'in.({seriales_str})',
+            'select': ','.join(MANTENIMIENTOS_COLUMNS),
+            # mtto_PK desempata para que la paginación sea estable
+            'order': 'serial.asc,datetime_maintenance_end.desc,mtto_PK.asc'
+        }
         
-        try:
-            # El API espera un query parameter con los seriales
-            # Formato: ?serial=in.(SERIAL1,SERIAL2,SERIAL3)
-            
-            seriales_str = ','.join(seriales)
-            params = {'serial': f'in.({seriales_str})'}
-            
-            logger.info(f"🔍 Consultando mantenimientos para {len(seriales)} seriales")
+        offset = 0
+        while limit is None or offset < limit:
+            page_limit = page_size if limit is None else min(page_size, limit - offset)
             
             response = self._make_request(
-                "GET", 
+                "GET",
                 "/mantenimientos",
-                params=params
+                params={**params, 'limit': page_limit, 'offset': offset}
             )
             
             if response is None:
-                logger.error("❌ Error obteniendo mantenimientos del API")
-                return []
+                raise ConnectionError("Error obteniendo mantenimientos del API")
             
             # La respuesta puede ser una lista directa o un dict con 'data'
             if isinstance(response, list):
-                mantenimientos = response
+                page = response
             elif isinstance(response, dict) and 'data' in response:
-                mantenimientos = response['data']
+                page = response['data']
             else:
-                logger.warning(f"Formato de respuesta inesperado: {type(response)}")
-                return []
+                raise ValueError(f"Formato de respuesta inesperado: {type(response)}")
+            
+            yield from page
+            
+            if len(page) < page_limit:
+                return
+            offset += len(page)
+    
+    def get_mantenimientos_by_seriales(self, seriales: List[str],
+                                       limit: Optional[int] = None) -> List[Dict]:
+        """
+        Obtiene mantenimientos filtrados por seriales
+        
+        Args:
+            seriales: Lista de números de serie
+            limit: Número máximo de registros (opcional)
+        
+        Returns:
+            Lista de mantenimientos, más recientes primero por serial
+        """
+        if not seriales:
+            logger.warning("Lista de seriales vacía")
+            return []
+        
+        try:
+            logger.info(f"🔍 Consultando mantenimientos para {len(seriales)} seriales")
+            
+            mantenimientos = list(self.iter_mantenimientos_by_seriales(seriales, limit=limit))
             
             logger.info(f"✅ Obtenidos {len(mantenimientos)} mantenimientos del API")
             return mantenimientos
@@ -128,7 +192,8 @@ class MantenimientosAPIClient:
         Obtiene todas las claves existentes (serial, id_reporte, observaciones) en una sola consulta
         
         OPTIMIZACIÓN: En lugar de verificar uno por uno (550 peticiones HTTP),
-        obtenemos todos de una vez (1 petición HTTP)
+        obtenemos todos de una vez (1 petición HTTP por página de
+        STREAM_PAGE_SIZE registros) y se procesan a medida que llegan
         
         Args:
             seriales: Lista de números de serie a consultar
@@ -139,17 +204,10 @@ class MantenimientosAPIClient:
         try:
             logger.info(f"🚀 OPTIMIZACIÓN: Obteniendo registros existentes en batch para {len(seriales)} seriales...")
             
-            # Obtener TODOS los mantenimientos de estos seriales de una vez
-            mantenimientos = self.get_mantenimientos_by_seriales(seriales)
-            
-            if not mantenimientos:
-                logger.info("✅ No hay registros existentes")
-                return set()
-            
-            # Crear conjunto de claves únicas
+            # Recorrer TODOS los mantenimientos de estos seriales sin materializarlos
             existing_keys = set()
             
-            for record in mantenimientos:
+            for record in self.iter_mantenimientos_by_seriales(seriales):
                 serial = str(record.get('serial', '')).strip()
                 id_reporte = record.get('report_id')
                 maintenance_remarks = record.get('maintenance_remarks')
@@ -273,14 +331,23 @@ class MantenimientosAPIClient:
     
     # ========== INSERCIÓN EN BATCH ==========
     
-    def upsert_mantenimiento_batch(self, records: List[Dict]) -> Tuple[int, int]:
+    def upsert_mantenimiento_batch(self, records: List[Dict],
+                                   batch_size: int = BATCH_INSERT_SIZE) -> Tuple[int, int]:
         """
-        Inserta múltiples mantenimientos en una sola petición
+        Inserta múltiples mantenimientos en una sola petición por bloque
+        
+        OPTIMIZACIÓN: En lugar de 550 peticiones, hace 1 por cada bloque de
+        `batch_size` registros (1 sola para sincronizaciones normales), sin
+        exceder el tamaño de cuerpo aceptado por el API
         
-        OPTIMIZACIÓN: En lugar de 550 peticiones, hace 1 sola
+        Se pide `Prefer: return=minimal` para que el API no serialice ni
+        devuelva las filas insertadas. La durabilidad del commit
+        (synchronous_commit) la define la configuración del servidor, no
+        este cliente.
         
         Args:
             records: Lista de diccionarios con datos de mantenimientos
+            batch_size: Máximo de registros por petición
         
         Returns:
             Tuple (exitosos, fallidos)
@@ -288,31 +355,46 @@ class MantenimientosAPIClient:
         if not records:
             return 0, 0
         
+        exitosos = 0
+        fallidos = 0
+        
         try:
             logger.info(f"📝 Insertando {len(records)} registros en batch...")
             
             headers = self.headers.copy()
+            headers["Prefer"] = "return=minimal"
             
-            # PostgREST permite insert de arrays
-            response = self._make_request(
-                "POST",
-                "/mantenimientos",
-                json=records,  # Array completo
-                headers=headers
-            )
+            for start in range(0, len(records), batch_size):
+                chunk = records[start:start + batch_size]
+                
+                # PostgREST permite insert de arrays; se serializa compacto
+                # (sin espacios ni escapes ASCII) para reducir el cuerpo
+                body = json.dumps(
+                    chunk, separators=(',', ':'), ensure_ascii=False, allow_nan=False
+                ).encode('utf-8')
+                
+                response = self._make_request(
+                    "POST",
+                    "/mantenimientos",
+                    data=body,  # Bloque completo
+                    headers=headers
+                )
+                
+                if response is not None:
+                    exitosos += len(chunk)
+                else:
+                    logger.error(f"❌ Error en inserción batch (registros {start}-{start + len(chunk) - 1})")
+                    fallidos += len(chunk)
             
-            if response is not None:
-                logger.info(f"✅ Batch insertado exitosamente: {len(records)} registros")
-                return len(records), 0
-            else:
-                logger.error(f"❌ Error en inserción batch")
-                return 0, len(records)
+            if exitosos:
+                logger.info(f"✅ Batch insertado exitosamente: {exitosos} registros")
+            return exitosos, fallidos
                 
         except Exception as e:
             logger.error(f"❌ Error en upsert_mantenimiento_batch: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
-            return 0, len(records)
+            return exitosos, len(records) - exitosos
     
     # ========== MÉTODO ANTIGUO (MANTENER POR COMPATIBILIDAD) ==========
     
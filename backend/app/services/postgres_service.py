@@ -16,12 +16,19 @@ POSTGRES_CONFIG = {
     'password': ''  # Se carga desde settings o .pgpass
 }
 
+# Índice para consultas por serial ordenadas por fecha de fin de mantenimiento
+MANTENIMIENTOS_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_mant_serial_end
+    ON monitoreo_equipos.mantenimientos (serial, datetime_maintenance_end DESC)
+"""
+
 
 class PostgresService:
     """Servicio para consultar mantenimientos desde PostgreSQL"""
     
     def __init__(self):
         self._connection = None
+        self._indexes_checked = False
         # Intentar usar settings si están disponibles
         try:
             from app.config.settings import get_settings
@@ -45,8 +52,29 @@ class PostgresService:
             except Exception as e:
                 logger.error(f"❌ Error conectando a PostgreSQL: {e}")
                 raise
+            
+            if not self._indexes_checked:
+                self._indexes_checked = True
+                self.ensure_indexes()
         return self._connection
     
+    def ensure_indexes(self):
+        """
+        Crea (una sola vez) los índices usados por las consultas por serial
+        
+        Si el usuario no tiene permisos para crear índices solo se registra
+        una advertencia; las consultas siguen funcionando sin el índice.
+        """
+        conn = self._connection
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(MANTENIMIENTOS_INDEX_SQL)
+            conn.commit()
+            logger.info("✅ Índice idx_mant_serial_end verificado")
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ No se pudo crear índice idx_mant_serial_end: {e}")
+    
     def get_mantenimientos_dataframe(self, seriales: List[str]) -> Optional[pd.DataFrame]:
         """
         Obtiene mantenimientos como DataFrame desde la tabla real
@@ -70,11 +98,9 @@ class PostgresService:
         try:
             conn = self._get_connection()
             
-            # Preparar query con placeholders
-            placeholders = ','.join(['%s'] * len(seriales))
-            
             # Query adaptada a la estructura real de la tabla
-            query = f"""
+            # (serial, fecha DESC) coincide con idx_mant_serial_end
+            query = """
                 SELECT 
                     serial,
                     datetime_maintenance_end as hora_salida,
@@ -82,14 +108,14 @@ class PostgresService:
                     device_brand as marca,
                     device_model as modelo
                 FROM monitoreo_equipos.mantenimientos
-                WHERE serial IN ({placeholders})
+                WHERE serial = ANY(%s)
                     AND datetime_maintenance_end IS NOT NULL
-                ORDER BY datetime_maintenance_end DESC
+                ORDER BY serial, datetime_maintenance_end DESC
             """
             
             # Ejecutar query
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                cursor.execute(query, tuple(seriales))
+                cursor.execute(query, (list(seriales),))
                 results = cursor.fetchall()
             
             if not results:
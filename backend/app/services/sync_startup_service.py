@@ -1,6 +1,7 @@
 import logging
+import uuid
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Set, Tuple, Optional
 import pandas as pd
 from app.services.crm_service import get_crm_service
 from app.services.mantenimientos_api_client import get_mantenimientos_api_client
@@ -92,48 +93,20 @@ class SyncStartupService:
             
             logger.info(f"🔧 [FASE 3/4] Preparando registros para inserción...")
             
-            records_to_insert = []
-            
-            for idx, row in df_mttos.iterrows():
-                try:
-                    # Preparar registro
-                    record = self._prepare_record(row)
-                    
-                    if not record:
-                        stats['registros_omitidos'] += 1
-                        continue
-                    
-                    # Verificar si existe usando el conjunto en memoria (O(1))
-                    serial = record['serial']
-                    id_reporte = record.get('report_id')
-                    maintenance_remarks = record.get('maintenance_remarks')
-                    
-                    # OPTIMIZACIÓN: Verificación en memoria en lugar de petición HTTP
-                    exists = self.api_client.check_if_exists_in_set(
-                        serial, id_reporte, maintenance_remarks, existing_keys
-                    )
-                    
-                    if exists:
-                        stats['registros_existentes'] += 1
-                        key_str = f"{serial}"
-                        if id_reporte:
-                            key_str += f" (ID: {id_reporte})"
-                        if maintenance_remarks:
-                            key_str += f" (Obs: {maintenance_remarks[:30]}...)"
-                        logger.debug(f"⏭️  {key_str} ya existe - omitiendo")
-                        continue
-                    
-                    # Agregar a lista de inserción
-                    records_to_insert.append(record)
-                
-                except Exception as e:
-                    logger.error(f"❌ Error preparando registro: {str(e)}")
-                    stats['errores'] += 1
-                    continue
+            records_to_insert, skip_stats = self._build_records(df_mttos, existing_keys)
+            
+            stats['registros_omitidos'] += skip_stats['omitidos']
+            stats['registros_existentes'] += skip_stats['existentes'] + skip_stats['duplicados']
+            stats['errores'] += skip_stats['errores']
             
             stats['tiempo_preparacion'] = (datetime.now() - fase3_start).total_seconds()
             logger.info(f"✅ Preparación completada en {stats['tiempo_preparacion']:.2f}s")
             logger.info(f"   Registros a insertar: {len(records_to_insert)}")
+            logger.info(
+                f"   Omitidos: {skip_stats['omitidos']} sin datos, "
+                f"{skip_stats['existentes']} existentes, "
+                f"{skip_stats['duplicados']} duplicados en el CRM, {skip_stats['errores']} con error"
+            )
             
             # ========== FASE 4: INSERCIÓN EN BATCH ==========
             if records_to_insert:
@@ -192,7 +165,104 @@ class SyncStartupService:
             stats['errores'] += 1
             return stats
     
-    def _prepare_record(self, row: pd.Series) -> Dict:
+    def _build_records(self, df_mttos: pd.DataFrame,
+                       existing_keys: Set[Tuple[str, str, str]]) -> Tuple[List[Dict], Dict]:
+        """
+        Valida y prepara los registros del CRM antes de enviarlos al API
+        
+        Paso puro en Python: no realiza peticiones, así la inserción opera
+        únicamente sobre registros ya validados. Los motivos por registro se
+        registran en DEBUG; el llamador reporta los totales.
+        
+        Además de los registros ya existentes en el API, se descartan las
+        repeticiones de una misma clave dentro de la respuesta del CRM, para
+        no escribir dos veces la misma fila.
+        
+        Args:
+            df_mttos: DataFrame con datos del CRM
+            existing_keys: Claves (serial, id_reporte, observaciones) ya existentes
+        
+        Returns:
+            Tuple (registros_a_insertar, skip_stats) con skip_stats
+            conteniendo 'omitidos', 'existentes', 'duplicados' y 'errores'
+        """
+        records = []
+        skip_stats = {'omitidos': 0, 'existentes': 0, 'duplicados': 0, 'errores': 0}
+        
+        # Claves aceptadas en esta misma pasada
+        batch_keys = set()
+        
+        # Convertir las fechas requeridas una sola vez para todo el DataFrame
+        fechas_fin = self._isoformat_column(df_mttos, 'hora_salida')
+        fechas_ods = self._isoformat_column(df_mttos, 'fecha_creacion')
+        
+        for (idx, row), fecha_fin, fecha_ods in zip(df_mttos.iterrows(), fechas_fin, fechas_ods):
+            try:
+                # Preparar registro
+                record = self._prepare_record(row, fecha_fin, fecha_ods)
+                
+                if not record:
+                    skip_stats['omitidos'] += 1
+                    continue
+                
+                # Verificar si existe usando el conjunto en memoria (O(1))
+                serial = record['serial']
+                id_reporte = record.get('report_id')
+                maintenance_remarks = record.get('maintenance_remarks')
+                
+                # OPTIMIZACIÓN: Verificación en memoria en lugar de petición HTTP
+                exists = self.api_client.check_if_exists_in_set(
+                    serial, id_reporte, maintenance_remarks, existing_keys
+                )
+                
+                if exists:
+                    skip_stats['existentes'] += 1
+                    key_str = f"{serial}"
+                    if id_reporte:
+                        key_str += f" (ID: {id_reporte})"
+                    if maintenance_remarks:
+                        key_str += f" (Obs: {maintenance_remarks[:30]}...)"
+                    logger.debug(f"⏭️  {key_str} ya existe - omitiendo")
+                    continue
+                
+                # Mismos valores normalizados que check_if_exists_in_set
+                key = (serial, id_reporte or '', maintenance_remarks or '')
+                if key in batch_keys:
+                    skip_stats['duplicados'] += 1
+                    logger.debug(f"⏭️  {serial} repetido en la respuesta del CRM - omitiendo")
+                    continue
+                batch_keys.add(key)
+                
+                # Agregar a lista de inserción
+                records.append(record)
+            
+            except Exception as e:
+                logger.debug(f"❌ Error preparando registro: {str(e)}")
+                skip_stats['errores'] += 1
+                continue
+        
+        return records, skip_stats
+    
+    @staticmethod
+    def _isoformat_column(df: pd.DataFrame, column: str) -> List[Optional[str]]:
+        """
+        Convierte una columna de fechas a ISO 8601 en una sola pasada
+        
+        Args:
+            df: DataFrame del CRM
+            column: Nombre de la columna de fecha
+        
+        Returns:
+            Lista alineada con las filas; None si la fecha falta o es inválida
+        """
+        if column not in df.columns:
+            return [None] * len(df)
+        
+        fechas = pd.to_datetime(df[column], errors='coerce')
+        return [fecha.isoformat() if pd.notna(fecha) else None for fecha in fechas]
+    
+    def _prepare_record(self, row: pd.Series, datetime_maintenance_end: Optional[str],
+                        datetime_ods_create: Optional[str]) -> Dict:
         """
         Prepara un registro del CRM para enviar al API
         
@@ -200,6 +270,8 @@ class SyncStartupService:
         
         Args:
             row: Fila del DataFrame del CRM
+            datetime_maintenance_end: Fecha de fin de mantenimiento ya convertida a ISO
+            datetime_ods_create: Fecha de creación ODS ya convertida a ISO
         
         Returns:
             Diccionario con datos preparados o None si hay error
@@ -213,31 +285,16 @@ class SyncStartupService:
             # ========== CAMPOS REQUERIDOS ==========
             
             # 1. Fecha de mantenimiento - REQUERIDO
-            hora_salida = row.get('hora_salida')
-            if pd.isna(hora_salida):
-                logger.debug(f"Serial {serial} sin fecha de mantenimiento - omitiendo")
-                return None
-            
-            try:
-                datetime_maintenance_end = pd.to_datetime(hora_salida).isoformat()
-            except:
-                logger.warning(f"Fecha inválida para serial {serial} - omitiendo")
+            if datetime_maintenance_end is None:
+                logger.debug(f"Serial {serial} sin fecha de mantenimiento válida - omitiendo")
                 return None
             
             # 2. Fecha de creación ODS - REQUERIDO
-            fecha_creacion = row.get('fecha_creacion')
-            if pd.isna(fecha_creacion):
-                logger.debug(f"Serial {serial} sin fecha de creacion ODS - omitiendo")
-                return None
-            
-            try:
-                datetime_ods_create = pd.to_datetime(fecha_creacion).isoformat()
-            except:
-                logger.warning(f"Fecha inválida para serial {serial} - omitiendo")
+            if datetime_ods_create is None:
+                logger.debug(f"Serial {serial} sin fecha de creacion ODS válida - omitiendo")
                 return None
             
             # 3. Generar UUID único para mtto_PK
-            import uuid
             mtto_pk = str(uuid.uuid4())
             
             # ========== CONSTRUIR REGISTRO BASE ==========
@@ -330,9 +387,9 @@ class SyncStartupService:
             return record
             
         except Exception as e:
-            logger.error(f"Error preparando registro: {str(e)}")
+            logger.debug(f"Error preparando registro: {str(e)}")
             import traceback
-            logger.error(traceback.format_exc())
+            logger.debug(traceback.format_exc())
             return None
 
 
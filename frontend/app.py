@@ -23,9 +23,16 @@ load_custom_css()
 pd.set_option('future.no_silent_downcasting', True)
 
 # Logo
-try:
+@st.cache_resource
+def _load_logo() -> Image.Image:
+    """Carga el logo desde disco una sola vez por proceso"""
     image = Image.open('img/cotel_small.png')
-    st.logo(image, size='large')
+    image.load()
+    return image
+
+
+try:
+    st.logo(_load_logo(), size='large')
 except:
     pass
 
@@ -45,6 +52,10 @@ def init_session_state():
         st.session_state.token = None
     if 'user_info' not in st.session_state:
         st.session_state.user_info = None
+    if 'risk_threshold' not in st.session_state:
+        st.session_state.risk_threshold = 0.8
+    if 'device_filter' not in st.session_state:
+        st.session_state.device_filter = None
 
 
 def render_public_interface():
@@ -101,13 +112,57 @@ def render_public_interface():
     """, height=500)
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _validate_token(token: str) -> bool:
+    """
+    Valida el token contra el backend, cacheado por token
+    
+    Args:
+        token: Token JWT de la sesión (clave del caché)
+    
+    Returns:
+        True si es válido, False en caso contrario
+    """
+    return get_api_client().validate_token()
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_dashboard_data(token: str, risk_threshold: float) -> dict:
+    """
+    Obtiene una sola vez por rerun los datos compartidos por los tabs
+    
+    Args:
+        token: Token JWT de la sesión (clave del caché)
+        risk_threshold: Umbral de riesgo (0-1)
+    
+    Returns:
+        Dict con prioridades, lista de dispositivos y recomendaciones
+    """
+    api_client = get_api_client()
+    # Peticiones independientes: se lanzan en paralelo
+    top_priority, devices_list, recommendations = api_client.gather(
+        # Una sola consulta: el top 5 del gráfico se toma localmente
+        lambda: api_client.get_top_priority_devices(risk_threshold=risk_threshold, top_n=20),
+        api_client.get_devices_list,
+        lambda: api_client.get_maintenance_recommendations(
+            risk_threshold=risk_threshold,
+            categoria="todos"
+        )
+    )
+    return {
+        'top_priority': top_priority,
+        'devices_list': devices_list,
+        'recommendations': recommendations
+    }
+
+
 def render_authenticated_interface():
     """Interfaz para usuarios autenticados"""
     try:
         api_client = get_api_client()
         
         # Verificar token
-        if not api_client.validate_token():
+        if not _validate_token(api_client.token):
             st.error("Sesión expirada. Por favor inicie sesión nuevamente.")
             st.session_state.authenticated = False
             st.session_state.token = None
@@ -123,20 +178,24 @@ def render_authenticated_interface():
         
         # Panel de control en sidebar
         container = st.sidebar.expander("Panel de Control", expanded=True, icon="🎛️")
-        risk_threshold, device_filter = render_control_panel(container, api_client)
+        risk_threshold, _ = render_control_panel(container, api_client)
+        
+        # Obtener datos compartidos por los tabs (el estado se retira al terminar)
+        status_placeholder = st.empty()
+        with status_placeholder.status("🔄 Cargando datos de dispositivos...", expanded=False) as status:
+            dashboard_data = _fetch_dashboard_data(api_client.token, risk_threshold)
+            status.update(label="✅ Datos cargados", state="complete")
+        status_placeholder.empty()
         
-        # Renderizar tabs
+        # Renderizar tabs (fragmentos: leen umbral y filtro de session_state)
         with tab1:
-            with st.spinner("🔄 Cargando datos de dispositivos..."):
-                render_tab1(api_client, risk_threshold, device_filter)
+            render_tab1(dashboard_data)
         
         with tab2:
-            with st.spinner("📊 Calculando proyecciones de riesgo..."):
-                render_tab2(api_client, risk_threshold, device_filter)
+            render_tab2(api_client, dashboard_data)
         
         with tab3:
-            with st.spinner("🎯 Generando recomendaciones de mantenimiento..."):
-                render_tab3(api_client, risk_threshold, device_filter)
+            render_tab3(dashboard_data)
         
     except Exception as e:
         st.error(f"❌ Error en la aplicación: {str(e)}")
@@ -1,8 +1,41 @@
+import numpy as np
+import orjson
+import streamlit as st
 import plotly.graph_objects as go
 from typing import List, Dict
 from utils.formatters import clean_device_name
 import plotly.express as px
 
+# Campos que determinan el gráfico de top dispositivos (clave del caché)
+_TOP_DEVICE_FIELDS = (
+    'dispositivo', 'tiempo_hasta_umbral_dias', 'marca', 'modelo',
+    'riesgo_actual', 'total_alarmas', 'serial'
+)
+
+# Campos de estadísticas usados por el gráfico de dona
+_PIE_STATISTICS_FIELDS = ('devices_critical', 'devices_high', 'devices_medium', 'devices_low')
+
+# Máximo de puntos por curva de riesgo enviados al navegador
+MAX_CURVE_POINTS = 500
+
+def _downsample_curve(curve_points: List[dict], max_points: int = MAX_CURVE_POINTS) -> List[dict]:
+    """
+    Reduce una curva densa a un máximo de puntos tomando muestras equiespaciadas
+    
+    Args:
+        curve_points: Puntos de la curva (tiempo_dias, riesgo_porcentaje)
+        max_points: Número máximo de puntos a conservar
+    
+    Returns:
+        Lista de puntos con el primero y el último siempre incluidos
+    """
+    total = len(curve_points)
+    if total <= max_points:
+        return curve_points
+    
+    indices = np.linspace(0, total - 1, max_points).round().astype(int)
+    return [curve_points[i] for i in indices]
+
 def create_top_devices_chart(devices: List[dict], risk_threshold: float) -> go.Figure:
     """
     Crea gráfico de barras horizontales con top dispositivos prioritarios
@@ -14,34 +47,36 @@ def create_top_devices_chart(devices: List[dict], risk_threshold: float) -> go.F
     Returns:
         Figura de Plotly
     """
-    fig = go.Figure()
-    
     # Invertir orden para mostrar mayor prioridad arriba
     devices = list(reversed(devices))
     
-    for device in devices:
-        # Determinar color según días hasta umbral
-        tiempo_dias = device['tiempo_hasta_umbral_dias']
-        if tiempo_dias < 7:
-            color = '#ef4444'
-        elif tiempo_dias < 30:
-            color = '#f59e0b'
-        else:
-            color = '#22c55e'
-        
+    # Determinar colores según días hasta umbral en una sola pasada
+    tiempo_dias = np.fromiter(
+        (device['tiempo_hasta_umbral_dias'] for device in devices),
+        dtype=np.float64,
+        count=len(devices)
+    )
+    colors = np.select(
+        [tiempo_dias < 7, tiempo_dias < 30],
+        ['#ef4444', '#f59e0b'],
+        default='#22c55e'
+    )
+    
+    bars = []
+    for device, dias, color in zip(devices, tiempo_dias.tolist(), colors.tolist()):
         device_name = clean_device_name(device['dispositivo'])
+        marca = device.get('marca', 'N/A')
+        modelo = device.get('modelo', 'N/A')
         
-        # Crear etiqueta con marca y modelo si están disponibles
-        if device.get('marca', 'N/A') != 'N/A' and device.get('modelo', 'N/A') != 'N/A':
-            device_label = f"{device_name}"
-        elif device.get('marca', 'N/A') != 'N/A':
-            device_label = f"{device_name} ({device['marca']})"
+        # Crear etiqueta con marca si no hay modelo disponible
+        if marca != 'N/A' and modelo == 'N/A':
+            device_label = f"{device_name} ({marca})"
         else:
             device_label = device_name
         
-        fig.add_trace(go.Bar(
+        bars.append(go.Bar(
             y=[device_label],
-            x=[tiempo_dias],
+            x=[dias],
             orientation='h',
             name=device_name,
             marker_color=color,
@@ -49,42 +84,41 @@ def create_top_devices_chart(devices: List[dict], risk_threshold: float) -> go.F
             hovertemplate=(
                 f"<b>{device_name}</b><br>" +
                 f"Serial: {device.get('serial', 'N/A')}<br>" +
-                f"Marca: {device.get('marca', 'N/A')}<br>" +
-                f"Modelo: {device.get('modelo', 'N/A')}<br>" +
-                f"Tiempo hasta {int(risk_threshold*100)}% riesgo: {tiempo_dias:.1f} días<br>" +
+                f"Marca: {marca}<br>" +
+                f"Modelo: {modelo}<br>" +
+                f"Tiempo hasta {int(risk_threshold*100)}% riesgo: {dias:.1f} días<br>" +
                 f"Riesgo actual: {device['riesgo_actual']:.1f}%<br>" +
                 f"Total alarmas: {device.get('total_alarmas', 'N/A')}<extra></extra>"
             )
         ))
     
-    fig.update_layout(
+    layout = go.Layout(
         paper_bgcolor='#0D2A2B',
         plot_bgcolor='#0D2A2B',
         height=360,
+        uirevision='constant',
         title={
             'text': f"🔧 Top {len(devices)} Equipos con Prioridad de Mantenimiento",
             'x': 0.5,
             'font': {'color': "#ffffff", 'family': 'Manrope'},
             'xanchor': 'center',
         },
-        xaxis_title="Días hasta umbral de riesgo",
-        yaxis_title="Equipos",
         margin=dict(l=30, r=40, t=55, b=30),
         xaxis=dict(
+            title=dict(text="Días hasta umbral de riesgo", font=dict(color='white', family='Manrope')),
             showline=True,
             linecolor='white',
             showgrid=False,
             zeroline=False,
-            title_font=dict(color='white', family='Manrope'),
             tickfont=dict(color='white', family='Manrope')
         ),
         yaxis=dict(
-            title_font=dict(color='white', family='Manrope'),
+            title=dict(text="Equipos", font=dict(color='white', family='Manrope')),
             tickfont=dict(color='white', family='Manrope')
         )
     )
     
-    return fig
+    return go.Figure(data=bars, layout=layout)
 
 
 def create_risk_pie_chart(statistics: Dict) -> go.Figure:
@@ -134,31 +168,35 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
     Returns:
         Figura de Plotly
     """
-    fig = go.Figure()
-    colors = px.colors.qualitative.Plotly
+    palette = px.colors.qualitative.Plotly
     
-    for i, prediction in enumerate(predictions):
+    # Determinar color según riesgo actual en una sola pasada
+    current_risks = np.fromiter(
+        (prediction['riesgo_actual'] for prediction in predictions),
+        dtype=np.float64,
+        count=len(predictions)
+    )
+    default_colors = np.array([palette[i % len(palette)] for i in range(len(predictions))], dtype=object)
+    colors = np.select(
+        [current_risks > 70, current_risks > 40],
+        ['#ef4444', '#f59e0b'],
+        default=default_colors
+    )
+    
+    traces = []
+    for prediction, current_risk, color in zip(predictions, current_risks.tolist(), colors.tolist()):
         if not prediction.get('curva_riesgo'):
             continue
         
         device_name = clean_device_name(prediction['dispositivo'])
-        curve_points = prediction['curva_riesgo']
+        curve_points = _downsample_curve(prediction['curva_riesgo'])
         
         # Extraer datos de la curva
         tiempos = [point['tiempo_dias'] for point in curve_points]
         riesgos = [point['riesgo_porcentaje'] for point in curve_points]
         
-        # Determinar color según riesgo actual
-        current_risk = prediction['riesgo_actual']
-        if current_risk > 70:
-            color = '#ef4444'
-        elif current_risk > 40:
-            color = '#f59e0b'
-        else:
-            color = colors[i % len(colors)]
-        
-        # Línea de curva de riesgo
-        fig.add_trace(go.Scatter(
+        # Línea de curva de riesgo (WebGL para muchas curvas)
+        traces.append(go.Scattergl(
             x=tiempos,
             y=riesgos,
             mode='lines',
@@ -173,7 +211,7 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
         ))
         
         # Punto actual
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=[0],
             y=[current_risk],
             mode='markers',
@@ -197,7 +235,7 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
             threshold_x_days = tiempo_hasta_umbral / 24.0
             threshold_y = risk_threshold * 100
             
-            fig.add_trace(go.Scatter(
+            traces.append(go.Scatter(
                 x=[threshold_x_days],
                 y=[threshold_y],
                 mode='markers',
@@ -218,18 +256,23 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
     
     # Línea horizontal del umbral
     risk_threshold_percent = risk_threshold * 100
-    fig.add_hline(
-        y=risk_threshold_percent,
-        line_dash="dash",
-        line_color="red",
+    threshold_line = dict(
+        type='line',
+        xref='x domain',
+        x0=0,
+        x1=1,
+        yref='y',
+        y0=risk_threshold_percent,
+        y1=risk_threshold_percent,
+        line=dict(dash='dash', color='red')
     )
     
-    fig.update_layout(
+    layout = go.Layout(
         paper_bgcolor='#113738',
         plot_bgcolor='#113738',
         height=270,width=1200,
-        xaxis_title="Días desde ahora",
-        yaxis_title="Probabilidad de Falla (%)",
+        uirevision='constant',
+        shapes=[threshold_line],
         margin=dict(l=10, r=10, t=30, b=0),
         legend=dict(
             orientation="h",
@@ -240,16 +283,16 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
         ),
         hovermode="closest",
         xaxis=dict(
+            title=dict(text="Días desde ahora", font=dict(color='white', family='Manrope')),
             range=[0, 220],
             showline=True,
             linecolor='white',
             showgrid=False,
             zeroline=False,
-            title_font=dict(color='white', family='Manrope'),
             tickfont=dict(color='white', family='Manrope')
         ),
         yaxis=dict(
-            title_font=dict(color='white', family='Manrope'),
+            title=dict(text="Probabilidad de Falla (%)", font=dict(color='white', family='Manrope')),
             tickfont=dict(color='white', family='Manrope'),
             ticksuffix="%",
             range=[0, 100]
@@ -257,4 +300,58 @@ def create_risk_curves(predictions: List[dict], risk_threshold: float) -> go.Fig
         font=dict(family='Manrope', color='white')
     )
     
-    return fig
\ No newline at end of file
+    return go.Figure(data=traces, layout=layout)
+
+
+# ============= VERSIONES CACHEADAS =============
+# Las figuras se reconstruyen sólo cuando cambian los datos de entrada.
+# La clave del caché son los campos usados por cada gráfico serializados con
+# orjson (bytes: rápidos de hashear). Se usa cache_resource para devolver la
+# misma figura sin deserializarla en cada rerun; las figuras no se modifican
+# después de crearlas.
+
+@st.cache_resource(ttl=60, max_entries=32, show_spinner=False)
+def _cached_top_devices_chart(devices_key: bytes, risk_threshold: float) -> go.Figure:
+    return create_top_devices_chart(orjson.loads(devices_key), risk_threshold)
+
+
+@st.cache_resource(ttl=60, max_entries=32, show_spinner=False)
+def _cached_risk_pie_chart(statistics_key: bytes) -> go.Figure:
+    return create_risk_pie_chart(orjson.loads(statistics_key))
+
+
+@st.cache_resource(ttl=60, max_entries=32, show_spinner=False)
+def _cached_risk_curves(predictions_key: bytes, risk_threshold: float) -> go.Figure:
+    return create_risk_curves(orjson.loads(predictions_key), risk_threshold)
+
+
+def create_top_devices_chart_cached(devices: List[dict], risk_threshold: float) -> go.Figure:
+    """Versión cacheada de create_top_devices_chart"""
+    devices_key = orjson.dumps([
+        {field: device.get(field, 'N/A') for field in _TOP_DEVICE_FIELDS}
+        for device in devices
+    ])
+    return _cached_top_devices_chart(devices_key, risk_threshold)
+
+
+def create_risk_pie_chart_cached(statistics: Dict) -> go.Figure:
+    """Versión cacheada de create_risk_pie_chart"""
+    statistics_key = orjson.dumps({field: statistics.get(field, 0) for field in _PIE_STATISTICS_FIELDS})
+    return _cached_risk_pie_chart(statistics_key)
+
+
+def create_risk_curves_cached(predictions: List[dict], risk_threshold: float) -> go.Figure:
+    """Versión cacheada de create_risk_curves"""
+    predictions_key = orjson.dumps([
+        {
+            'dispositivo': prediction['dispositivo'],
+            'riesgo_actual': prediction['riesgo_actual'],
+            'tiempo_hasta_umbral': prediction.get('tiempo_hasta_umbral'),
+            'curva_riesgo': [
+                {'tiempo_dias': point['tiempo_dias'], 'riesgo_porcentaje': point['riesgo_porcentaje']}
+                for point in prediction.get('curva_riesgo') or ()
+            ]
+        }
+        for prediction in predictions
+    ])
+    return _cached_risk_curves(predictions_key, risk_threshold)
@@ -1,13 +1,28 @@
 import streamlit as st
 from typing import Tuple, List, Optional
-import re
+from utils.formatters import clean_device_name
 
+# A partir de este número de equipos el multiselect se filtra con un buscador
+DEVICE_SEARCH_THRESHOLD = 500
+# Máximo de opciones enviadas al multiselect cuando se usa el buscador
+MAX_DEVICE_OPTIONS = 100
 
-def clean_device_name(device_name: str) -> str:
-    """Elimina IP del nombre del dispositivo"""
-    if not isinstance(device_name, str):
-        return device_name
-    return re.sub(r'\s*\([^)]*\)$', '', device_name).strip()
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _prepared_devices(token: Optional[str], _api_client) -> Tuple[List[str], dict]:
+    """
+    Obtiene la lista de dispositivos con nombres limpios y ordenados
+    
+    Args:
+        token: Token JWT de la sesión (clave del caché)
+        _api_client: Cliente de API (excluido de la clave del caché)
+    
+    Returns:
+        Tuple (nombres limpios ordenados, mapeo nombre limpio -> nombre original)
+    """
+    devices = _api_client.get_devices_list()
+    device_mapping = {clean_device_name(device): device for device in devices}
+    return sorted(device_mapping), device_mapping
 
 
 def render_sidebar_login(api_client):
@@ -81,6 +96,10 @@ def render_control_panel(container, api_client) -> Tuple[float, Optional[List[st
     """
     Renderiza el panel de control con filtros
     
+    Los valores seleccionados también se guardan en st.session_state
+    (risk_threshold, device_filter) para que los fragmentos de cada tab
+    los lean sin recibirlos como argumentos.
+    
     Args:
         container: Contenedor de Streamlit
         api_client: Cliente de API
@@ -94,32 +113,48 @@ def render_control_panel(container, api_client) -> Tuple[float, Optional[List[st
         min_value=1.0,
         max_value=100.0,
         value=80.0,
-        step=0.1,
-        format="%.1f%%",
+        step=1.0,
+        format="%.0f%%",
         help="Probabilidad de falla a monitorear (80% = alto riesgo)"
     ) / 100
     
-    # Obtener lista de dispositivos
+    # Obtener lista de dispositivos (nombres limpios y ordenados, cacheados)
     with st.spinner("Cargando dispositivos..."):
-        devices = api_client.get_devices_list()
+        clean_device_names, device_mapping = _prepared_devices(api_client.token, api_client)
     
-    if not devices:
+    st.session_state.risk_threshold = risk_threshold_decimal
+    
+    if not clean_device_names:
+        # No guardar en caché el fallo para reintentar en el próximo rerun
+        _prepared_devices.clear(api_client.token, api_client)
         container.warning("⚠️ No se pudieron cargar los dispositivos")
+        st.session_state.device_filter = None
         return risk_threshold_decimal, None
     
-    # Limpiar nombres de dispositivos
-    clean_device_names = sorted([clean_device_name(device) for device in devices])
-    device_mapping = {clean_device_name(device): device for device in devices}
+    # Con muchos equipos, prefiltrar con un buscador y limitar las opciones
+    device_options = clean_device_names
+    if len(clean_device_names) > DEVICE_SEARCH_THRESHOLD:
+        query = container.text_input(
+            "🔎 Buscar equipo",
+            placeholder="Escribe parte del nombre",
+            key="device_search"
+        ).strip().lower()
+        selected = st.session_state.get("device_filter_select", [])
+        matches = [name for name in clean_device_names if query in name.lower()][:MAX_DEVICE_OPTIONS]
+        # Mantener siempre las selecciones actuales entre las opciones
+        device_options = selected + [name for name in matches if name not in selected]
     
     # Multiselect de dispositivos
     device_filter_clean = container.multiselect(
         "🔍 Filtrar Equipos",
-        options=clean_device_names,
+        options=device_options,
         default=[],
+        key="device_filter_select",
         help="Vacío = todos los Equipos"
     )
     
     # Mapear de vuelta a nombres originales
     device_filter = [device_mapping[clean_name] for clean_name in device_filter_clean] if device_filter_clean else None
+    st.session_state.device_filter = device_filter
     
     return risk_threshold_decimal, device_filter
\ No newline at end of file
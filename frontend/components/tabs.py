@@ -1,58 +1,97 @@
 import streamlit as st
-import pandas as pd
+from html import escape
 import plotly.graph_objects as go
 from typing import Optional, List
-from components.charts import create_top_devices_chart, create_risk_pie_chart, create_risk_curves
+from components.charts import create_top_devices_chart_cached, create_risk_pie_chart_cached, create_risk_curves_cached
 from utils.formatters import clean_device_name, hours_to_days_hours, format_maintenance_date
 
+# Plantilla HTML de las métricas personalizadas
+_METRIC_TEMPLATE = """
+<div style="background-color: {bg_color};padding: 1rem;border-radius: 0.5rem;text-align: center;cursor: help;" title="{hint}">
+    <div style="font-size: 14px;color: #ffffff;margin-bottom: 2px;font-weight: 400;">
+        {label}
+    </div>
+    <div style="font-size: 24px;color: {color};font-weight: 500;line-height: 0.8;">
+        {value}
+    </div>
+</div>
+"""
+
+# Colores de las tarjetas según categoría de mantenimiento
+_COLOR_CONFIG = {
+    'critico': {'bg': '#fef2f2', 'border': '#ef4444', 'text': '#dc2626', 'icon': '❄️'},
+    'alto': {'bg': '#fffbeb', 'border': '#f59e0b', 'text': '#d97706', 'icon': '❄️'},
+    'planificar': {'bg': '#f0f9ff', 'border': '#0ea5e9', 'text': '#0369a1', 'icon': '❄️'}
+}
+
+# Plantilla HTML (en una sola línea) de la tarjeta de un dispositivo
+_DEVICE_CARD_TEMPLATE = (
+    "<details class='device-card'>"
+    "<summary>{icon} {device_name}</summary>"
+    # Información principal
+    "<div style='background-color: {bg}; border-left: 5px solid {border}; "
+    "padding: 15px; margin: 10px; border-radius: 5px;'>"
+    "<p style='margin: 0px 0; font-size: 12px; color:#000000;'>"
+    "<strong>🔢 Serial:</strong> {serial}<br>"
+    "<strong>🏢 Cliente:</strong> {cliente}<br>"
+    "<strong>🏷️ Marca:</strong> {marca}<br>"
+    "<strong>📋 Modelo:</strong> {modelo}<br>"
+    "<strong>🔧 Último mantenimiento:</strong> {ultimo_mantenimiento}<br>"
+    "<strong>⏱️ Tiempo hasta umbral:</strong> {tiempo_hasta_umbral}<br>"
+    "<strong>📊 Riesgo actual:</strong> {riesgo_actual:.1f}%"
+    "</p></div>"
+    # Detalle secundario
+    "<details class='device-analysis'>"
+    "<summary>🔍 Análisis Técnico y Recomendaciones</summary>"
+    "<div class='device-analysis-grid'>"
+    "<div><p>Fallas Detectadas</p>{fallas_html}</div>"
+    "<div><p>Acciones Recomendadas</p><ul>{recomendaciones_html}</ul></div>"
+    "</div></details>"
+    "</details>"
+)
+
 
 def custom_metric(label: str, value: str, hint: str = "", color: str = "#ffffff", bg_color: str = "#0D2A2B"):
     """Métrica personalizada con hint"""
-    html = f"""
-    <div style="background-color: {bg_color};padding: 1rem;border-radius: 0.5rem;text-align: center;cursor: help;" title="{hint}">
-        <div style="font-size: 14px;color: #ffffff;margin-bottom: 2px;font-weight: 400;">
-            {label}
-        </div>
-        <div style="font-size: 24px;color: {color};font-weight: 500;line-height: 0.8;">
-            {value}
-        </div>
-    </div>
-    """
+    html = _METRIC_TEMPLATE.format(label=label, value=value, hint=hint, color=color, bg_color=bg_color)
     st.markdown(html, unsafe_allow_html=True)
 
 
-def render_tab1(api_client, risk_threshold: float, device_filter: Optional[List[str]] = None):
+@st.fragment
+def render_tab1(dashboard_data: dict):
     """
     Renderiza Tab 1: Resumen
     
+    El umbral de riesgo y el filtro de dispositivos se leen de
+    st.session_state (los escribe el panel de control).
+    
     Args:
-        api_client: Cliente de API
-        risk_threshold: Umbral de riesgo (0-1)
-        device_filter: Filtro opcional de dispositivos
+        dashboard_data: Datos compartidos obtenidos una vez por rerun
     """
+    risk_threshold = st.session_state.risk_threshold
+    device_filter = st.session_state.device_filter
+    filter_set = frozenset(device_filter) if device_filter else None
+    
     priority_col, summary_col = st.columns([3, 1])
     
+    # Una sola respuesta (top 20) alimenta el gráfico y las estadísticas
+    response = dashboard_data['top_priority']
+    
     with priority_col:
         try:
-            # Obtener top dispositivos con prioridad
-            response = api_client.get_top_priority_devices(
-                risk_threshold=risk_threshold,
-                top_n=5
-            )
-            
             if response and response.get('devices'):
-                devices = response['devices']
-                statistics = response.get('statistics', {})
+                # Top 5 dispositivos con prioridad
+                devices = response['devices'][:5]
                 
                 # Aplicar filtro de dispositivos si existe
-                if device_filter:
-                    devices = [d for d in devices if d['dispositivo'] in device_filter]
+                if filter_set:
+                    devices = [d for d in devices if d['dispositivo'] in filter_set]
                 
                 if devices:
                     # Crear gráfico de barras
-                    fig = create_top_devices_chart(devices, risk_threshold)
+                    fig = create_top_devices_chart_cached(devices, risk_threshold)
                     cont_top5 = st.container(key='cont-top5')
-                    cont_top5.plotly_chart(fig, width='content', config={'displayModeBar': False})
+                    cont_top5.plotly_chart(fig, width='content', key='top5_chart', config={'displayModeBar': False})
                 else:
                     st.info("📊 No hay dispositivos con riesgo identificado para los filtros actuales")
             else:
@@ -63,19 +102,14 @@ def render_tab1(api_client, risk_threshold: float, device_filter: Optional[List[
     
     with summary_col:
         try:
-            # Obtener estadísticas
-            response = api_client.get_top_priority_devices(
-                risk_threshold=risk_threshold,
-                top_n=20  # Obtener todos para estadísticas
-            )
-            
+            # Todos los dispositivos para estadísticas
             if response and response.get('devices'):
                 devices = response['devices']
                 statistics = response.get('statistics', {})
                 
                 # Aplicar filtro si existe
-                if device_filter:
-                    devices = [d for d in devices if d['dispositivo'] in device_filter]
+                if filter_set:
+                    devices = [d for d in devices if d['dispositivo'] in filter_set]
                     # Recalcular estadísticas
                     statistics = calculate_statistics_from_devices(devices)
                 
@@ -89,22 +123,28 @@ def render_tab1(api_client, risk_threshold: float, device_filter: Optional[List[
     render_footer()
 
 
-def render_tab2(api_client, risk_threshold: float, device_filter: Optional[List[str]] = None):
+@st.fragment
+def render_tab2(api_client, dashboard_data: dict):
     """
     Renderiza Tab 2: Proyección de Riesgo
     
+    El slider de número de equipos solo vuelve a ejecutar este fragmento.
+    
     Args:
         api_client: Cliente de API
-        risk_threshold: Umbral de riesgo (0-1)
-        device_filter: Filtro opcional de dispositivos
+        dashboard_data: Datos compartidos obtenidos una vez por rerun
     """
+    risk_threshold = st.session_state.risk_threshold
+    device_filter = st.session_state.device_filter
+    filter_set = frozenset(device_filter) if device_filter else None
+    
     try:
-        # Obtener lista de dispositivos
-        devices_list = api_client.get_devices_list()
+        # Lista de dispositivos
+        devices_list = dashboard_data['devices_list']
         
         # Aplicar filtro si existe
-        if device_filter:
-            devices_list = [d for d in devices_list if d in device_filter]
+        if filter_set:
+            devices_list = [d for d in devices_list if d in filter_set]
         
         if not devices_list:
             st.info("📊 No hay dispositivos disponibles con los filtros actuales")
@@ -124,19 +164,22 @@ def render_tab2(api_client, risk_threshold: float, device_filter: Optional[List[
                 value=min(5, len(devices_list))
             )
         
-        # Obtener predicciones batch
-        with st.spinner("Calculando proyecciones de riesgo..."):
+        # Obtener predicciones batch (el estado se retira al terminar)
+        status_placeholder = st.empty()
+        with status_placeholder.status("⏳ Calculando proyecciones de riesgo...", expanded=False) as status:
             predictions = api_client.get_batch_predictions(
                 dispositivos=devices_list[:top_n],
                 risk_threshold=risk_threshold,
                 max_time=5000,
                 include_curve=True
             )
+            status.update(label="✅ Proyecciones calculadas", state="complete")
+        status_placeholder.empty()
         
         if predictions:
             # Crear gráfico de curvas de riesgo
-            fig = create_risk_curves(predictions, risk_threshold)
-            st.plotly_chart(fig, width='content', config={'displayModeBar': True})
+            fig = create_risk_curves_cached(predictions, risk_threshold)
+            st.plotly_chart(fig, width='content', key='risk_curves_chart', config={'displayModeBar': True})
         else:
             st.info("📊 No se pudieron calcular proyecciones para los dispositivos seleccionados")
     
@@ -146,30 +189,28 @@ def render_tab2(api_client, risk_threshold: float, device_filter: Optional[List[
     render_footer()
 
 
-def render_tab3(api_client, risk_threshold: float, device_filter: Optional[List[str]] = None):
+@st.fragment
+def render_tab3(dashboard_data: dict):
     """
     Renderiza Tab 3: Recomendaciones de Mantenimiento
     
     Args:
-        api_client: Cliente de API
-        risk_threshold: Umbral de riesgo (0-1)
-        device_filter: Filtro opcional de dispositivos
+        dashboard_data: Datos compartidos obtenidos una vez por rerun
     """
+    device_filter = st.session_state.device_filter
+    filter_set = frozenset(device_filter) if device_filter else None
+    
     try:
-        # Obtener recomendaciones
-        with st.spinner("Generando recomendaciones de mantenimiento..."):
-            recommendations = api_client.get_maintenance_recommendations(
-                risk_threshold=risk_threshold,
-                categoria="todos"
-            )
+        # Recomendaciones
+        recommendations = dashboard_data['recommendations']
         
         if not recommendations:
             st.info("✅ No hay equipos que requieran mantenimiento inmediato")
             return
         
         # Aplicar filtro de dispositivos si existe
-        if device_filter:
-            recommendations = [r for r in recommendations if r['equipo'] in device_filter]
+        if filter_set:
+            recommendations = [r for r in recommendations if r['equipo'] in filter_set]
         
         if not recommendations:
             st.info("✅ No hay equipos que requieran mantenimiento con los filtros actuales")
@@ -198,8 +239,7 @@ def render_tab3(api_client, risk_threshold: float, device_filter: Optional[List[
 
 def calculate_statistics_from_devices(devices: List[dict]) -> dict:
     """Calcula estadísticas desde lista de dispositivos"""
-    df = pd.DataFrame(devices)
-    if df.empty:
+    if not devices:
         return {
             'total_devices': 0,
             'devices_critical': 0,
@@ -209,18 +249,29 @@ def calculate_statistics_from_devices(devices: List[dict]) -> dict:
             'average_risk': 0.0
         }
     
-    critico = len(df[df['tiempo_hasta_umbral_dias'] < 7])
-    alto = len(df[(df['tiempo_hasta_umbral_dias'] >= 7) & (df['tiempo_hasta_umbral_dias'] < 30)])
-    medio = len(df[(df['tiempo_hasta_umbral_dias'] >= 30) & (df['tiempo_hasta_umbral_dias'] < 90)])
-    bajo = len(df[df['tiempo_hasta_umbral_dias'] >= 90])
+    # Conteo en una sola pasada: crítico (<7d) | alto (<30d) | medio (<90d) | bajo
+    counts = [0, 0, 0, 0]
+    risk_sum = 0.0
+    risk_count = 0
+    for device in devices:
+        days = device.get('tiempo_hasta_umbral_dias')
+        # None y NaN no cuentan en ninguna categoría
+        if days is not None and days == days:
+            counts[(days >= 7) + (days >= 30) + (days >= 90)] += 1
+        risk = device.get('riesgo_actual')
+        if risk is not None and risk == risk:
+            risk_sum += risk
+            risk_count += 1
+    
+    critico, alto, medio, bajo = counts
     
     return {
-        'total_devices': len(df),
+        'total_devices': len(devices),
         'devices_critical': critico,
         'devices_high': alto,
         'devices_medium': medio,
         'devices_low': bajo,
-        'average_risk': float(df['riesgo_actual'].mean())
+        'average_risk': risk_sum / risk_count if risk_count else float('nan')
     }
 
 
@@ -256,71 +307,63 @@ def render_summary_statistics(statistics: dict):
     
     # Gráfico de dona
     if statistics.get('total_devices', 0) > 0:
-        fig = create_risk_pie_chart(statistics)
-        cont_alert.plotly_chart(fig, width='content', config={'displayModeBar': False})
+        fig = create_risk_pie_chart_cached(statistics)
+        cont_alert.plotly_chart(fig, width='content', key='risk_pie_chart', config={'displayModeBar': False})
 
 
 def render_maintenance_section(recommendations: List[dict], title: str, container_key: str, categoria: str):
     """Renderiza una sección de mantenimiento"""
     with st.container(key=container_key):
         with st.expander(f"{title}: {len(recommendations)} equipo(s)", expanded=True):
-            # Crear filas de 2 columnas
-            for i in range(0, len(recommendations), 2):
-                cols = st.columns(2)
-                for j in range(2):
-                    if i + j < len(recommendations):
-                        with cols[j]:
-                            render_device_card(recommendations[i + j], categoria)
+            # Toda la sección en un solo bloque HTML (grilla de 2 columnas)
+            cards = ''.join(build_device_card_html(rec, categoria) for rec in recommendations)
+            st.markdown(f"<div class='device-grid'>{cards}</div>", unsafe_allow_html=True)
 
 
-def render_device_card(recommendation: dict, categoria: str):
-    """Renderiza una tarjeta de dispositivo"""
-    # Colores según categoría
-    color_config = {
-        'critico': {'bg': '#fef2f2', 'border': '#ef4444', 'text': '#dc2626', 'icon': '❄️'},
-        'alto': {'bg': '#fffbeb', 'border': '#f59e0b', 'text': '#d97706', 'icon': '❄️'},
-        'planificar': {'bg': '#f0f9ff', 'border': '#0ea5e9', 'text': '#0369a1', 'icon': '❄️'}
-    }
+def build_device_card_html(recommendation: dict, categoria: str) -> str:
+    """
+    Construye el HTML de la tarjeta de un dispositivo
     
-    config = color_config.get(categoria, color_config['planificar'])
+    Los expanders anidados se reemplazan por <details> nativos para no crear
+    elementos de Streamlit por tarjeta. El HTML va en una sola línea: una línea
+    en blanco o indentada haría que el markdown cerrara el bloque HTML.
     
-    device_name = clean_device_name(recommendation['equipo'])
+    Args:
+        recommendation: Recomendación de mantenimiento del dispositivo
+        categoria: Categoría (critico, alto, planificar)
     
-    with st.expander(f"{config['icon']} {device_name}", expanded=False):
-        # Información principal
-        st.markdown(f"""
-        <div style='background-color: {config['bg']}; border-left: 5px solid {config['border']}; 
-                    padding: 15px; margin: 10px 0; border-radius: 5px;'>
-            <p style='margin: 0px 0; font-size: 12px; color:#000000;'>
-            <strong>🔢 Serial:</strong> {recommendation['serial']}<br>
-            <strong>🏢 Cliente:</strong> {recommendation['cliente']}<br>
-            <strong>🏷️ Marca:</strong> {recommendation['marca']}<br>
-            <strong>📋 Modelo:</strong> {recommendation['modelo']}<br>
-            <strong>🔧 Último mantenimiento:</strong> {recommendation['ultimo_mantenimiento']}<br>
-            <strong>⏱️ Tiempo hasta umbral:</strong> {hours_to_days_hours(recommendation['tiempo_hasta_umbral'])}<br>
-            <strong>📊 Riesgo actual:</strong> {recommendation['riesgo_actual']:.1f}%
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Expander secundario
-        with st.expander("🔍 Análisis Técnico y Recomendaciones", expanded=False):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.text("Fallas Detectadas")
-                fallas = recommendation.get('fallas_detectadas', [])
-                if fallas:
-                    for falla in fallas:
-                        st.write(f"• {falla}")
-                else:
-                    st.info("✅ No se detectaron fallas críticas")
-            
-            with col2:
-                st.text("Acciones Recomendadas")
-                recomendaciones = recommendation.get('recomendaciones', [])
-                for rec in recomendaciones:
-                    st.write(f"• {rec}")
+    Returns:
+        String HTML de la tarjeta
+    """
+    config = _COLOR_CONFIG.get(categoria, _COLOR_CONFIG['planificar'])
+    
+    device_name = escape(str(clean_device_name(recommendation['equipo'])))
+    
+    fallas = recommendation.get('fallas_detectadas', [])
+    if fallas:
+        fallas_html = ''.join(f"<li>{escape(str(falla))}</li>" for falla in fallas)
+        fallas_html = f"<ul>{fallas_html}</ul>"
+    else:
+        fallas_html = "<p>✅ No se detectaron fallas críticas</p>"
+    
+    recomendaciones = recommendation.get('recomendaciones', [])
+    recomendaciones_html = ''.join(f"<li>{escape(str(rec))}</li>" for rec in recomendaciones)
+    
+    return _DEVICE_CARD_TEMPLATE.format(
+        icon=config['icon'],
+        bg=config['bg'],
+        border=config['border'],
+        device_name=device_name,
+        serial=escape(str(recommendation['serial'])),
+        cliente=escape(str(recommendation['cliente'])),
+        marca=escape(str(recommendation['marca'])),
+        modelo=escape(str(recommendation['modelo'])),
+        ultimo_mantenimiento=escape(str(recommendation['ultimo_mantenimiento'])),
+        tiempo_hasta_umbral=hours_to_days_hours(recommendation['tiempo_hasta_umbral']),
+        riesgo_actual=recommendation['riesgo_actual'],
+        fallas_html=fallas_html,
+        recomendaciones_html=recomendaciones_html
+    )
 
 
 def render_footer():
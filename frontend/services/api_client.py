@@ -1,11 +1,34 @@
+import ijson
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
-from typing import Optional, List, Dict
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Callable, Any
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pool de conexiones HTTP reutilizadas entre reruns
+HTTP_POOL_SIZE = 10
+HTTP_RETRIES = Retry(total=2, backoff_factor=0.2)
+
+# Hilos para peticiones independientes lanzadas en paralelo
+GATHER_MAX_WORKERS = 4
+
+
+# ============= CACHÉ DE ENDPOINTS =============
+# base_url y token completo forman parte de la clave: un nuevo login invalida
+# el caché (un prefijo del JWT no sirve, todos empiezan igual). Los errores se
+# propagan como excepción, así que nunca quedan guardados en el caché.
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_get(base_url: str, token: Optional[str], endpoint: str, params: tuple) -> Any:
+    return get_api_client()._send("GET", endpoint, params=dict(params))
+
 
 class APIClient:
     """Cliente para comunicación con el backend FastAPI"""
@@ -14,13 +37,23 @@ class APIClient:
         self.base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
         self.api_prefix = "/api/v1"
         self._token = None
+        # (token, headers): los headers se reconstruyen solo si cambia el token
+        self._headers_cache = (None, None)
+        
+        # Sesión HTTP con keep-alive: evita abrir una conexión TCP/TLS por petición
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE,
+            pool_maxsize=HTTP_POOL_SIZE,
+            max_retries=HTTP_RETRIES
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
     
     @property
     def token(self) -> Optional[str]:
         """Obtiene token de la sesión de Streamlit"""
-        if 'token' in st.session_state:
-            return st.session_state.token
-        return self._token
+        return st.session_state.get('token', self._token)
     
     @token.setter
     def token(self, value: str):
@@ -30,31 +63,74 @@ class APIClient:
     
     @property
     def headers(self) -> Dict:
-        """Headers con autenticación"""
+        """
+        Headers con autenticación
+        
+        El cliente es un singleton compartido entre sesiones, por eso el caché
+        se compara contra el token actual en lugar de invalidarse en el setter.
+        """
+        token = self.token
+        cached_token, cached_headers = self._headers_cache
+        if cached_headers is not None and cached_token == token:
+            return cached_headers
+        
         headers = {"Content-Type": "application/json"}
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._headers_cache = (token, headers)
         return headers
     
-    def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
+    def _send(self, method: str, endpoint: str, stream_prefix: Optional[str] = None, **kwargs) -> Any:
         """
-        Realiza una petición HTTP al backend
+        Envía la petición HTTP y parsea el JSON; lanza excepción si falla
         
         Args:
             method: Método HTTP (GET, POST, etc.)
             endpoint: Endpoint de la API
+            stream_prefix: Prefijo ijson de los elementos a extraer (ej: 'item' para
+                un arreglo JSON). Si se indica, la respuesta se parsea mientras se
+                descarga y se retorna la lista de elementos.
             **kwargs: Argumentos adicionales para requests
         
         Returns:
-            Respuesta JSON o None si hay error
+            Respuesta JSON
         """
         url = f"{self.base_url}{self.api_prefix}{endpoint}"
         kwargs['headers'] = self.headers
         
+        if stream_prefix is not None:
+            with self._session.request(method, url, **kwargs, stream=True, timeout=120) as response:
+                response.raise_for_status()
+                # Descomprimir gzip/deflate al leer el stream crudo
+                response.raw.decode_content = True
+                return list(ijson.items(response.raw, stream_prefix, use_float=True))
+        
+        response = self._session.request(method, url, **kwargs, timeout=120)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    def _make_request(self, method: str, endpoint: str, stream_prefix: Optional[str] = None,
+                      **kwargs) -> Optional[Dict]:
+        """
+        Realiza una petición HTTP al backend
+        
+        Las peticiones GET se sirven desde caché (st.cache_data) por token,
+        endpoint y parámetros.
+        
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            endpoint: Endpoint de la API
+            stream_prefix: Prefijo ijson para parsear la respuesta en streaming
+            **kwargs: Argumentos adicionales para requests
+        
+        Returns:
+            Respuesta JSON o None si hay error
+        """
         try:
-            response = requests.request(method, url, **kwargs, timeout=120)
-            response.raise_for_status()
-            return response.json()
+            if method == "GET" and stream_prefix is None:
+                params = tuple(sorted((kwargs.get('params') or {}).items()))
+                return _cached_get(self.base_url, self.token, endpoint, params)
+            return self._send(method, endpoint, stream_prefix, **kwargs)
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 401:
                 st.error("Sesión expirada. Por favor inicie sesión nuevamente.")
@@ -64,7 +140,7 @@ class APIClient:
             else:
                 st.error(f"Error HTTP: {e.response.status_code}")
                 try:
-                    error_detail = e.response.json().get('detail', str(e))
+                    error_detail = orjson.loads(e.response.content).get('detail', str(e))
                     st.error(f"Detalle: {error_detail}")
                 except:
                     st.error(f"Detalle: {str(e)}")
@@ -79,6 +155,28 @@ class APIClient:
             st.error(f"Error inesperado: {str(e)}")
             return None
     
+    def gather(self, *calls: Callable[[], Any]) -> List[Any]:
+        """
+        Ejecuta en paralelo llamadas independientes al backend
+        
+        Cada hilo recibe el contexto del script actual para poder usar
+        st.session_state, st.error y el caché de Streamlit.
+        
+        Args:
+            *calls: Funciones sin argumentos (ej: lambda: self.get_devices_list())
+        
+        Returns:
+            Lista de resultados en el mismo orden de las llamadas
+        """
+        ctx = get_script_run_ctx()
+        
+        def run(call: Callable[[], Any]) -> Any:
+            add_script_run_ctx(ctx=ctx)
+            return call()
+        
+        with ThreadPoolExecutor(max_workers=GATHER_MAX_WORKERS) as executor:
+            return list(executor.map(run, calls))
+    
     # ============= AUTH ENDPOINTS =============
     
     def login(self, username: str, password: str) -> bool:
@@ -220,7 +318,9 @@ class APIClient:
         }
         params = {"include_curve": include_curve}
         
-        response = self._make_request("POST", "/predictions/batch", json=data, params=params)
+        # Con curvas la respuesta es grande: se parsea a medida que llega
+        response = self._make_request("POST", "/predictions/batch", stream_prefix="item",
+                                      json=data, params=params)
         return response if response else []
     
     # ============= MAINTENANCE ENDPOINTS =============
@@ -1,9 +1,28 @@
 import streamlit as st
+from charset_normalizer import from_bytes
 import pandas as pd
+import numpy as np
 import re
+import os
+import mmap
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 
+# IP entre paréntesis al final del nombre del dispositivo
+_IP_PATTERN = r'\s*\([^)]*\)$'
+_IP_RE = re.compile(_IP_PATTERN)
 
+# Motor opcional más rápido para el caso escalar; si no está instalado
+# (o su API no es compatible) se usa el módulo re estándar
+try:
+    import fastregex
+    _IP_SUB_RE = fastregex.compile(_IP_PATTERN)
+except (ImportError, AttributeError):
+    _IP_SUB_RE = _IP_RE
+
+
+@lru_cache(maxsize=4096)
 def clean_device_name(device_name: str) -> str:
     """
     Elimina la parte del IP entre paréntesis del nombre del dispositivo
@@ -20,10 +39,27 @@ def clean_device_name(device_name: str) -> str:
     if pd.isna(device_name) or not isinstance(device_name, str):
         return device_name
     
-    cleaned_name = re.sub(r'\s*\([^)]*\)$', '', device_name).strip()
+    cleaned_name = _IP_SUB_RE.sub('', device_name).strip()
     return cleaned_name
 
 
+def clean_device_name_series(device_names: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de clean_device_name para una columna completa
+    
+    Args:
+        device_names: Serie con nombres de dispositivos con IP
+    
+    Returns:
+        Serie con nombres limpios; los valores que no son texto se conservan
+    """
+    # pandas requiere un patrón de re, no el motor opcional
+    cleaned = device_names.str.replace(_IP_RE, '', regex=True).str.strip()
+    # .str deja NaN en los valores que no son texto: restaurar el original
+    return cleaned.where(cleaned.notna(), device_names)
+
+
+@lru_cache(maxsize=2048)
 def hours_to_days_hours(hours) -> str:
     """
     Convierte horas a formato días y horas
@@ -51,6 +87,33 @@ def hours_to_days_hours(hours) -> str:
         return "N/A"
 
 
+def hours_to_days_hours_series(hours: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de hours_to_days_hours para una columna completa
+    
+    Args:
+        hours: Serie con número de horas
+    
+    Returns:
+        Serie de strings formateados (ej: "2d 5h", "12h", "N/A")
+    """
+    values = pd.to_numeric(hours, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.isfinite(values) & (values >= 0)
+    safe_values = np.where(valid, values, 0.0)
+    
+    days = (safe_values // 24).astype(np.int64)
+    remaining_hours = np.rint(safe_values % 24).astype(np.int64)
+    days_str = days.astype(str).astype(object)
+    hours_str = remaining_hours.astype(str).astype(object)
+    
+    formatted = np.select(
+        [~valid, days == 0, remaining_hours == 0],
+        ['N/A', hours_str + 'h', days_str + 'd'],
+        default=days_str + 'd ' + hours_str + 'h'
+    )
+    return pd.Series(formatted, index=hours.index)
+
+
 def format_maintenance_date(date_str: str) -> str:
     """
     Formatea la fecha de mantenimiento de manera amigable
@@ -58,6 +121,23 @@ def format_maintenance_date(date_str: str) -> str:
     Args:
         date_str: Fecha en formato string o datetime
     
+    Returns:
+        String formateado de forma amigable
+    """
+    # El día actual forma parte de la clave: el caché no queda desactualizado
+    # al cambiar de día
+    return _format_maintenance_date_cached(date_str, datetime.now().date().toordinal())
+
+
+@lru_cache(maxsize=4096)
+def _format_maintenance_date_cached(date_str, today_ordinal: int) -> str:
+    """
+    Implementación cacheada de format_maintenance_date
+    
+    Args:
+        date_str: Fecha en formato string o datetime
+        today_ordinal: Día actual como ordinal (date.toordinal)
+    
     Returns:
         String formateado de forma amigable
     """
@@ -71,7 +151,7 @@ def format_maintenance_date(date_str: str) -> str:
         else:
             date = date_str
         
-        days_ago = (datetime.now().date() - date.date()).days
+        days_ago = today_ordinal - date.date().toordinal()
         
         if days_ago == 0:
             return "Hoy"
@@ -89,6 +169,51 @@ def format_maintenance_date(date_str: str) -> str:
         return str(date_str)
 
 
+def format_maintenance_date_series(dates: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de format_maintenance_date para una columna completa
+    
+    Args:
+        dates: Serie con fechas (string o datetime)
+    
+    Returns:
+        Serie de strings formateados de forma amigable
+    """
+    missing = (dates.isna() | (dates == "Nunca")).to_numpy()
+    
+    try:
+        parsed = pd.to_datetime(dates.where(~missing), errors='coerce', format='mixed')
+        if parsed.dt.tz is not None:
+            # Conservar la fecha local (igual que date.date() en la versión escalar)
+            parsed = parsed.dt.tz_localize(None)
+    except (ValueError, TypeError, AttributeError):
+        # Zonas horarias mezcladas u otros casos raros: usar la versión escalar
+        return dates.map(format_maintenance_date)
+    
+    unparsed = parsed.isna().to_numpy() & ~missing
+    today = pd.Timestamp(datetime.now().date())
+    days_ago = (today - parsed.dt.normalize()).dt.days.fillna(0).to_numpy(dtype=np.int64)
+    weeks = days_ago // 7
+    
+    days_str = days_ago.astype(str).astype(object)
+    weeks_str = weeks.astype(str).astype(object)
+    plural = np.where(weeks > 1, 's', '').astype(object)
+    
+    formatted = np.select(
+        [missing, unparsed, days_ago == 0, days_ago == 1, days_ago < 7, days_ago < 30],
+        [
+            "Nunca",
+            dates.astype(str).to_numpy(dtype=object),
+            "Hoy",
+            "Ayer",
+            "Hace " + days_str + " días",
+            "Hace " + weeks_str + " semana" + plural
+        ],
+        default=parsed.dt.strftime("%d/%m/%Y").to_numpy(dtype=object)
+    )
+    return pd.Series(formatted, index=dates.index)
+
+
 def format_risk_percentage(risk: float) -> str:
     """
     Formatea el porcentaje de riesgo con color
@@ -112,6 +237,43 @@ def format_risk_percentage(risk: float) -> str:
     return f"<span style='color: {color}; font-weight: bold;'>{emoji} {risk:.1f}%</span>"
 
 
+# Inicio del HTML por nivel de riesgo (código 0: >=70, 1: >=40, 2: resto)
+_RISK_LEVEL_PREFIXES = np.array([
+    "<span style='color: #ef4444; font-weight: bold;'>🔴 ",
+    "<span style='color: #f59e0b; font-weight: bold;'>🟠 ",
+    "<span style='color: #22c55e; font-weight: bold;'>🟢 ",
+], dtype=object)
+
+
+def _risk_level_codes(risk_values: np.ndarray) -> np.ndarray:
+    """
+    Calcula el código de nivel de riesgo de cada valor en una sola pasada
+    
+    Args:
+        risk_values: Arreglo de riesgos (0-100)
+    
+    Returns:
+        Arreglo int8 con códigos 0 (>=70), 1 (>=40) o 2 (resto, incluye NaN)
+    """
+    return np.select([risk_values >= 70, risk_values >= 40], [0, 1], default=2).astype(np.int8)
+
+
+def format_risk_percentage_series(risks: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de format_risk_percentage para una columna completa
+    
+    Args:
+        risks: Serie con valores de riesgo (0-100)
+    
+    Returns:
+        Serie de HTML formateado con color
+    """
+    values = pd.to_numeric(risks, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = _risk_level_codes(values)
+    formatted = np.char.mod('%.1f', values).astype(object)
+    return pd.Series(_RISK_LEVEL_PREFIXES[codes] + formatted + '%</span>', index=risks.index)
+
+
 def format_time_until_threshold(hours: float) -> str:
     """
     Formatea el tiempo hasta umbral con emoji según urgencia
@@ -137,6 +299,45 @@ def format_time_until_threshold(hours: float) -> str:
     return f"{emoji} {time_str}"
 
 
+# Codificaciones candidatas si el CSS no está en UTF-8
+_CSS_FALLBACK_ENCODINGS = ['cp1252', 'latin_1', 'iso8859_15']
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _read_css(file_path: str) -> Optional[str]:
+    """
+    Lee el archivo CSS y lo mantiene en caché (se vuelve a leer cada hora
+    para tomar cambios del archivo sin reiniciar la app)
+    
+    Args:
+        file_path: Ruta al archivo CSS
+    
+    Returns:
+        Contenido del CSS o None si el archivo no existe
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            # mmap no admite archivos vacíos
+            if os.fstat(f.fileno()).st_size == 0:
+                return ""
+            
+            # Decodificar directamente desde el mapeo en memoria, sin copiar a bytes
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                # Caso habitual: UTF-8
+                try:
+                    return str(view, 'utf-8')
+                except UnicodeDecodeError:
+                    raw_content = view.tobytes()
+    except FileNotFoundError:
+        return None
+    
+    # Otra codificación: detectarla sobre los mismos bytes entre las
+    # codificaciones occidentales esperadas para el archivo
+    best_match = from_bytes(raw_content, cp_isolation=_CSS_FALLBACK_ENCODINGS).best()
+    encoding = best_match.encoding if best_match else 'utf-8'
+    return raw_content.decode(encoding, errors='ignore')
+
+
 def load_custom_css(file_path: str = "styles/style.css"):
     """
     Carga CSS personalizado desde archivo
@@ -145,26 +346,14 @@ def load_custom_css(file_path: str = "styles/style.css"):
         file_path: Ruta al archivo CSS
     """
     try:
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+        css_content = _read_css(file_path)
         
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    css_content = f.read()
-                st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
-                return
-            except UnicodeDecodeError:
-                continue
-            except FileNotFoundError:
-                # Si no existe el archivo, usar CSS por defecto
-                load_default_css()
-                return
+        if css_content is None:
+            # Si no existe el archivo, usar CSS por defecto
+            load_default_css()
+            return
         
-        # Si todas las codificaciones fallan
-        with open(file_path, 'rb') as f:
-            raw_content = f.read()
-            css_content = raw_content.decode('utf-8', errors='ignore')
-            st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
+        st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
             
     except Exception as e:
         print(f"Error cargando CSS: {str(e)}")
@@ -4,8 +4,14 @@ Script de verificación de conexión al API de Mantenimientos
 Prueba la conexión y funcionalidad básica del API REST externo
 """
 
+import io
 import sys
+import atexit
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 
 # Colores para terminal
@@ -27,6 +33,41 @@ HEADERS = {
     "Content-Profile": "monitoreo_equipos"
 }
 
+# Sesión compartida por todos los tests: reutiliza la conexión TLS
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3)
+))
+atexit.register(SESSION.close)
+
+
+class ThreadBufferedOutput:
+    """Salida estándar que acumula lo impreso por cada hilo en su propio buffer"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def start_capture(self):
+        """Empieza a acumular la salida del hilo actual"""
+        self._local.buffer = io.StringIO()
+    
+    def stop_capture(self):
+        """Deja de acumular y retorna lo impreso por el hilo actual"""
+        buffer = self._local.buffer
+        self._local.buffer = None
+        return buffer.getvalue()
+    
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer or self._stream).write(text)
+    
+    def flush(self):
+        self._stream.flush()
+
 
 def print_header():
     """Imprime encabezado del script"""
@@ -61,9 +102,8 @@ def test_basic_connection():
     print_info("Test 1: Conexión básica al API...")
     
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{API_BASE_URL}/mantenimientos",
-            headers=HEADERS,
             params={'limit': 1},
             timeout=10
         )
@@ -96,9 +136,8 @@ def test_query_by_serial():
     test_serial = "JK1142005099"  # Serial conocido de prueba
     
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{API_BASE_URL}/mantenimientos",
-            headers=HEADERS,
             params={'serial': f'eq.{test_serial}'},
             timeout=10
         )
@@ -143,9 +182,8 @@ def test_query_multiple_serials():
     serials_str = ','.join(test_serials)
     
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{API_BASE_URL}/mantenimientos",
-            headers=HEADERS,
             params={'serial': f'in.({serials_str})'},
             timeout=10
         )
@@ -234,9 +272,8 @@ def test_response_format():
     print_info("Test 5: Verificación de formato de respuesta...")
     
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{API_BASE_URL}/mantenimientos",
-            headers=HEADERS,
             params={'limit': 1},
             timeout=10
         )
@@ -282,6 +319,25 @@ def test_response_format():
         return False
 
 
+def run_test(test_name, test_func):
+    """Ejecuta un test y retorna su resultado (False si lanza excepción)"""
+    try:
+        return test_func()
+    except Exception as e:
+        print_error(f"Error ejecutando test '{test_name}': {str(e)}")
+        return False
+
+
+def run_test_captured(output, test_name, test_func):
+    """Ejecuta un test en un hilo del pool acumulando su salida"""
+    output.start_capture()
+    try:
+        result = run_test(test_name, test_func)
+    finally:
+        text = output.stop_capture()
+    return result, text
+
+
 def main():
     """Función principal"""
     print_header()
@@ -299,19 +355,37 @@ def main():
         ("Expiración de token", test_token_expiration),
         ("Formato de respuesta", test_response_format)
     ]
+    # Tests locales (sin red): se ejecutan primero en el hilo principal
+    local_tests = {"Expiración de token"}
     
-    results = []
+    test_results = {}
     
     for test_name, test_func in tests:
-        try:
-            result = test_func()
-            results.append((test_name, result))
-            print()
-        except Exception as e:
-            print_error(f"Error ejecutando test '{test_name}': {str(e)}")
-            results.append((test_name, False))
+        if test_name in local_tests:
+            test_results[test_name] = run_test(test_name, test_func)
             print()
     
+    # Tests de red en paralelo; la salida de cada uno se imprime completa
+    # al terminar para que no se mezcle con la de los demás
+    output = ThreadBufferedOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(run_test_captured, output, test_name, test_func): test_name
+                for test_name, test_func in tests
+                if test_name not in local_tests
+            }
+            for future in as_completed(futures):
+                result, text = future.result()
+                test_results[futures[future]] = result
+                print(text)
+    finally:
+        sys.stdout = output._stream
+    
+    # Resultados en el orden original de los tests
+    results = [(test_name, test_results[test_name]) for test_name, _ in tests]
+    
     # Resumen
     print("=" * 80)
     print(f"{BLUE}Resumen de Tests{RESET}")